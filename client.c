@@ -6,6 +6,7 @@
 #include <sys/socket.h>
 #include <assert.h>
 #include <errno.h>
+#include <ctype.h>
 
 #include "data_structures/string/lite_string.h"
 #include "data_structures/vector/vector_c.h"
@@ -79,6 +80,19 @@ static int32_t write_all(const int fd, const char *buf, size_t n) {
     return 0;
 }
 
+/**
+ * @brief Calculates the length of the request for the given command vector.
+ *
+ * @param cmd The command vector containing the commands to be sent.
+ * @return The length of the message, excluding the 4-byte length prefix.
+ */
+static uint32_t req_length(const ptr_vector *cmd) {
+    uint32_t len = 4;
+    for (size_t i = 0; i < ptr_vector_size(cmd); ++i)
+        len += 4 + string_length(ptr_vector_at(cmd, i));
+    return len;
+}
+
 /**
  * @brief Sends a request to the specified file descriptor with the given command vector.
  *
@@ -97,11 +111,7 @@ static int32_t write_all(const int fd, const char *buf, size_t n) {
 
  */
 static int32_t send_req(const int fd, const ptr_vector *cmd) {
-    uint32_t len = 4;
-
-    // Calculate the length of the message
-    for (size_t i = 0; i < ptr_vector_size(cmd); ++i)
-        len += 4 + string_length(ptr_vector_at(cmd, i));
+    const uint32_t len = req_length(cmd);
 
     // Check if the message is too long
     if (len > k_max_msg) return -1;
@@ -282,6 +292,102 @@ static int32_t read_res(const int fd) {
     return rv;
 }
 
+/**
+ * @brief Frees the strings in a command vector and clears it.
+ *
+ * @param cmd The command vector to clear.
+ */
+static void clear_cmd(ptr_vector *cmd) {
+    for (size_t i = 0; i < ptr_vector_size(cmd); ++i)
+        string_free(ptr_vector_at(cmd, i));
+    ptr_vector_clear(cmd);
+}
+
+/**
+ * @brief Splits a line into command arguments, the way a POSIX shell would.
+ *
+ * Arguments are separated by whitespace.\n
+ * Single quotes preserve their contents literally, double quotes allow escaping
+ * a double quote or a backslash, and a backslash outside quotes escapes the next character.
+ *
+ * @param line The line to split.
+ * @param cmd The command vector to append the arguments to.
+ * @return 0 on success, or -1 if the line contains an unterminated quote.
+ */
+static int32_t split_args(const char *line, ptr_vector *cmd) {
+    const char *p = line;
+    while (*p) {
+        // Skip the whitespace between arguments
+        while (isspace((unsigned char) *p)) ++p;
+        if (!*p) break;
+
+        lite_string *arg = string_new();
+        ptr_vector_push_back(cmd, arg);
+        while (*p && !isspace((unsigned char) *p)) {
+            if (*p == '\'') {
+                const char *end = strchr(p + 1, '\'');
+                if (!end) return -1;
+                string_append_cstr_range(arg, p + 1, (size_t) (end - p - 1));
+                p = end + 1;
+            } else if (*p == '"') {
+                for (++p; *p && *p != '"'; ++p) {
+                    if (*p == '\\' && (p[1] == '"' || p[1] == '\\')) ++p;
+                    string_push_back(arg, *p);
+                }
+                if (!*p) return -1;
+                ++p;
+            } else {
+                if (*p == '\\' && p[1]) ++p;
+                string_push_back(arg, *p++);
+            }
+        }
+    }
+    return 0;
+}
+
+/**
+ * @brief Runs the commands read from a stream, one command per line.
+ *
+ * Each command is sent to the server and its response is printed,
+ * followed by an \p (end) line that marks the end of the response.\n
+ * Blank lines are skipped.
+ *
+ * @param fd The file descriptor connected to the server.
+ * @param in The stream to read the commands from.
+ * @param flush Whether to flush the output after each response, so that it can be read right away.
+ * @return 0 on success, or -1 if the connection failed.
+ */
+static int32_t run_script(const int fd, FILE *in, const bool flush) {
+    char *line = nullptr;
+    size_t cap = 0;
+    int32_t rv = 0;
+    ptr_vector *cmd = ptr_vector_new();
+
+    while (getline(&line, &cap, in) != -1) {
+        if (split_args(line, cmd) != 0) {
+            fputs("unterminated quote\n", stderr);
+        } else if (ptr_vector_empty(cmd)) {
+            continue;
+        } else if (req_length(cmd) > k_max_msg) {
+            fputs("message too long\n", stderr);
+        } else if (send_req(fd, cmd) != 0) {
+            report_error("write() error");
+            rv = -1;
+            break;
+        } else if (read_res(fd) < 0) {
+            rv = -1;
+            break;
+        }
+        clear_cmd(cmd);
+        puts("(end)");
+        if (flush) fflush(stdout);
+    }
+    clear_cmd(cmd);
+    ptr_vector_free(cmd);
+    free(line);
+    return rv;
+}
+
 int main(int argc, char **argv) {
     // Default port number
     int port = 1234;
@@ -306,11 +412,16 @@ int main(int argc, char **argv) {
         argc -= 2;
     }
     if (argc == 2 && (strcmp(argv[1], "help") == 0 || strcmp(argv[1], "--help") == 0)) {
-        puts("Usage: client [-h | --help] [--port PORT] <command> [args...]\n");
+        puts("Usage: client [-h | --help] [--port PORT] <command> [args...]");
+        puts("       client [--port PORT] --script FILE");
+        puts("       client [--port PORT] --repl\n");
         puts("Send a command to the Cachetron server and print the response.\n");
         puts("Options:");
         puts("  -h, --help\tShow this help message and exit.");
-        puts("  --port PORT\tSpecify the port number to connect to.\n");
+        puts("  --port PORT\tSpecify the port number to connect to.");
+        puts("  --script FILE\tRun the commands in FILE ('-' for stdin), one per line.");
+        puts("\t\tEach response is followed by an '(end)' line.");
+        puts("  --repl\tRead commands from stdin like '--script -', printing each response right away.\n");
         puts("Send 'COMMAND' to the server to get a list of available commands.");
         return 0;
     }
@@ -319,6 +430,14 @@ int main(int argc, char **argv) {
         fputs("Usage: client [-h | --help] [--port PORT] <command> [args...]\n", stderr);
         return 1;
     }
+    // Check for script mode (the REPL mode is script mode on stdin, flushing each response)
+    const char *script = nullptr;
+    bool repl = false;
+    if (argc == 3 && strcmp(argv[1], "--script") == 0) script = argv[2];
+    else if (argc == 2 && strcmp(argv[1], "--repl") == 0) {
+        script = "-";
+        repl = true;
+    }
     // Create a socket
     const int fd = socket(AF_INET, SOCK_STREAM, 0);
     if (fd < 0) die("socket() failure");
@@ -332,6 +451,16 @@ int main(int argc, char **argv) {
     const int rv = connect(fd, (const struct sockaddr *) &addr, sizeof addr);
     if (rv) die("connect() failure");
 
+    if (script) {
+        // Run the commands in the script over this connection
+        FILE *in = strcmp(script, "-") == 0 ? stdin : fopen(script, "r");
+        if (!in) die("fopen() failure");
+        const int32_t err = run_script(fd, in, repl);
+        if (in != stdin) fclose(in);
+        close(fd);
+        return err ? 1 : 0;
+    }
+
     // Send the request
     ptr_vector *cmd = ptr_vector_new();
     for (int i = 1; i < argc; ++i) {
@@ -1,100 +1,159 @@
 #!/usr/bin/env python3
 import os
 import sys
+import stat
+import errno
 import shlex
+import select
+import socket
+import struct
 import atexit
 import argparse
 import subprocess
-from time import sleep
-from typing import List, Tuple
-from termcolor import colored
-from multiprocessing import Process, Value
-
-CASES = r'''
-$ ./client asdf
-(err) 1 Unknown cmd
-$ ./client get asdf
-(nil)
-$ ./client set k v
-(nil)
-$ ./client get k
-(str) v
-$ ./client keys
-(arr) len=1
-(str) k
-(arr) end
-$ ./client set k2 v2
-(nil)
-$ ./client exists k
-(int) 1
-$ ./client exists k k2 asdf k k2
-(int) 2
-$ ./client del k
-(int) 1
-$ ./client del k2
-(int) 1
-$ ./client del k
-(int) 0
-$ ./client keys
-(arr) len=0
-(arr) end
-$ ./client exists k
-(int) 0
-$ ./client zscore asdf n1
-(nil)
-$ ./client zquery xxx 1 asdf 1 10
-(arr) len=0
-(arr) end
-$ ./client zadd zset 1 n1
-(int) 1
-$ ./client zadd zset 2 n2
-(int) 1
-$ ./client zadd zset 1.1 n1
-(int) 0
-$ ./client zscore zset n1
-(dbl) 1.1
-$ ./client zquery zset 1 "" 0 10
-(arr) len=4
-(str) n1
-(dbl) 1.1
-(str) n2
-(dbl) 2
-(arr) end
-$ ./client zquery zset 1.1 "" 1 10
-(arr) len=2
-(str) n2
-(dbl) 2
-(arr) end
-$ ./client zquery zset 1.1 "" 2 10
-(arr) len=0
-(arr) end
-$ ./client zrem zset adsf
-(int) 0
-$ ./client zrem zset n1
-(int) 1
-$ ./client zquery zset 1 "" 0 10
-(arr) len=2
-(str) n2
-(dbl) 2
-(arr) end
-$ ./client shutdown
-(str) Server is shutting down...
-'''
+from time import monotonic, sleep
+from functools import lru_cache, partial
+from typing import TYPE_CHECKING, Callable, List, NamedTuple, Optional, Sequence, Tuple
+
+if TYPE_CHECKING:
+    from concurrent.futures import ThreadPoolExecutor
+
+
+class Case(NamedTuple):
+    """
+    A test case.
+    """
+    argv: Tuple[str, ...]  # The command and its arguments
+    expected: bytes  # The expected output
+    display: str  # The command as displayed in failure reports
+
+
+def display_text(argv: Sequence[str]) -> str:
+    """
+    Formats a command for failure reports.
+    :param argv: The command and its arguments.
+    :return: The arguments separated by spaces, with empty arguments shown as "".
+    """
+    return ' '.join(arg or '""' for arg in argv)
+
+
+# The test cases: each command and its expected output, run in order
+CASES: Tuple[Case, ...] = tuple(Case(argv, expected, display_text(argv)) for argv, expected in (
+    (('asdf',), b'(err) 1 Unknown cmd\n'),
+    (('get', 'asdf'), b'(nil)\n'),
+    (('set', 'k', 'v'), b'(nil)\n'),
+    (('get', 'k'), b'(str) v\n'),
+    (('keys',),
+     b'(arr) len=1\n'
+     b'(str) k\n'
+     b'(arr) end\n'),
+    (('set', 'k2', 'v2'), b'(nil)\n'),
+    (('exists', 'k'), b'(int) 1\n'),
+    (('exists', 'k', 'k2', 'asdf', 'k', 'k2'), b'(int) 2\n'),
+    (('del', 'k'), b'(int) 1\n'),
+    (('del', 'k2'), b'(int) 1\n'),
+    (('del', 'k'), b'(int) 0\n'),
+    (('keys',),
+     b'(arr) len=0\n'
+     b'(arr) end\n'),
+    (('exists', 'k'), b'(int) 0\n'),
+    (('zscore', 'asdf', 'n1'), b'(nil)\n'),
+    (('zquery', 'xxx', '1', 'asdf', '1', '10'),
+     b'(arr) len=0\n'
+     b'(arr) end\n'),
+    (('zadd', 'zset', '1', 'n1'), b'(int) 1\n'),
+    (('zadd', 'zset', '2', 'n2'), b'(int) 1\n'),
+    (('zadd', 'zset', '1.1', 'n1'), b'(int) 0\n'),
+    (('zscore', 'zset', 'n1'), b'(dbl) 1.1\n'),
+    (('zquery', 'zset', '1', '', '0', '10'),
+     b'(arr) len=4\n'
+     b'(str) n1\n'
+     b'(dbl) 1.1\n'
+     b'(str) n2\n'
+     b'(dbl) 2\n'
+     b'(arr) end\n'),
+    (('zquery', 'zset', '1.1', '', '1', '10'),
+     b'(arr) len=2\n'
+     b'(str) n2\n'
+     b'(dbl) 2\n'
+     b'(arr) end\n'),
+    (('zquery', 'zset', '1.1', '', '2', '10'),
+     b'(arr) len=0\n'
+     b'(arr) end\n'),
+    (('zrem', 'zset', 'adsf'), b'(int) 0\n'),
+    (('zrem', 'zset', 'n1'), b'(int) 1\n'),
+    (('zquery', 'zset', '1', '', '0', '10'),
+     b'(arr) len=2\n'
+     b'(str) n2\n'
+     b'(dbl) 2\n'
+     b'(arr) end\n'),
+    (('shutdown',), b'(str) Server is shutting down...\n'),
+))
+
+# ANSI escape sequences for the test report, set by init_colors()
+RED = RED_BOLD = GREEN = CYAN = MAGENTA = YELLOW_BOLD = YELLOW_BOLD_REVERSE = ''
+BLUE_BOLD = BLUE_BOLD_UNDERLINE = RESET = ''
+
+
+def init_colors() -> None:
+    """
+    Sets the ANSI escape sequences used in the test report.
+
+    Colors are disabled if NO_COLOR or ANSI_COLORS_DISABLED is set,
+    or if stdout is not a terminal and FORCE_COLOR is not set.
+    :return: None
+    """
+    global RED, RED_BOLD, GREEN, CYAN, MAGENTA, YELLOW_BOLD, YELLOW_BOLD_REVERSE
+    global BLUE_BOLD, BLUE_BOLD_UNDERLINE, RESET
+
+    enabled = ('NO_COLOR' not in os.environ and 'ANSI_COLORS_DISABLED' not in os.environ and
+               ('FORCE_COLOR' in os.environ or sys.stdout.isatty()))
+    if enabled:
+        RED, RED_BOLD, GREEN, CYAN, MAGENTA = '\x1b[31m', '\x1b[1;31m', '\x1b[32m', '\x1b[36m', '\x1b[35m'
+        YELLOW_BOLD, YELLOW_BOLD_REVERSE = '\x1b[1;33m', '\x1b[1;7;33m'
+        BLUE_BOLD, BLUE_BOLD_UNDERLINE = '\x1b[1;34m', '\x1b[1;4;34m'
+        RESET = '\x1b[0m'
+    else:
+        RED = RED_BOLD = GREEN = CYAN = MAGENTA = YELLOW_BOLD = YELLOW_BOLD_REVERSE = ''
+        BLUE_BOLD = BLUE_BOLD_UNDERLINE = RESET = ''
+
+
+init_colors()
+
+# The server listens on IPv4 only; connect to the loopback address directly (like the client)
+# so that probing the port does not need a name lookup every time.
+SERVER_HOST = '127.0.0.1'
+
+# Timeout in seconds for each connection attempt when probing the server,
+# and the number of attempts before giving up on a port that does not answer
+PROBE_TIMEOUT = 0.05
+PROBE_ATTEMPTS = 3
 
 
 def is_server_running(port: int = 1234) -> bool:
     """
     Checks if the server is running.
+
+    A fresh socket is needed for every check, as Linux does not allow
+    reconnecting a socket after a refused connection.
+    Each attempt is bounded by PROBE_TIMEOUT, so a port that drops the connection request
+    (e.g. behind a firewall) does not stall the check. Only timed out attempts are retried.
     :param port: Port number to check.
     :return: True if the server is running, False otherwise.
     """
-    import socket
+    for _ in range(PROBE_ATTEMPTS):
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+            s.settimeout(PROBE_TIMEOUT)
+            err = s.connect_ex((SERVER_HOST, port))
+        if err != errno.EWOULDBLOCK:
+            return err == 0
+    return False
 
-    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-        return s.connect_ex(('localhost', port)) == 0
 
+# The server process, if it was started by this script
+server_process: Optional[subprocess.Popen] = None
 
-server_pid = Value('i', 0)
+# Set once the shutdown command has succeeded, so that the server is left to exit on its own
+shutdown_sent = False
 
 
 def start_server(server_path: str, port: int = 1234) -> None:
@@ -104,66 +163,154 @@ def start_server(server_path: str, port: int = 1234) -> None:
     :param port: Port number to listen on.
     :return: None
     """
+    global server_process
+    # A new session keeps terminal signals (e.g. Ctrl+C) away from the server; stop_server() handles it
+    server_process = subprocess.Popen([server_path, "--port", str(port)],
+                                      stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                                      close_fds=False, start_new_session=True)
+    wait_for_server(port)
 
-    def run_server() -> None:
-        """
-        Runs the server.
-        :return: None
-        """
-        global server_pid
-        server_process = subprocess.Popen([server_path, "--port", str(port)],
-                                          stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-        server_pid.value = server_process.pid
 
-    server_process_ = Process(target=run_server)
-    server_process_.start()
-    sleep(0.5)  # Wait for the server to start
+def wait_for_server(port: int = 1234, timeout: float = 2.0) -> None:
+    """
+    Waits for the server to accept connections, polling the port with exponential backoff.
+    :param port: Port number the server listens on.
+    :param timeout: Maximum time to wait, in seconds.
+    :return: None
+    """
+    deadline = monotonic() + timeout
+    delay = 0.002
+    while monotonic() < deadline:
+        if is_server_running(port):
+            return
+        # No point in waiting for a server that has already exited (e.g. the port is in use)
+        if server_process is not None and server_process.poll() is not None:
+            raise RuntimeError(f'Server exited unexpectedly with status {server_process.returncode}.')
+        sleep(delay)
+        delay = min(delay * 2, 0.05)
+    raise TimeoutError('Server did not become ready in time.')
 
 
 def stop_server() -> None:
     """
-    Stops the server.
+    Stops the server, if it was started by this script.
+
+    After a successful shutdown command, the server is given 1 second to exit on its own.
+    Otherwise, it is terminated, and killed only if it does not exit within 2 seconds.
+    Nothing is sent if it has already exited.
     :return: None
     """
-    if server_pid.value:
+    global server_process
+    if server_process is None:
+        return
+    if shutdown_sent:
         try:
-            os.kill(server_pid.value, 9)
-        except OSError:
+            server_process.wait(timeout=1)
+        except subprocess.TimeoutExpired:
             pass
+    if server_process.poll() is None:
+        server_process.terminate()
+        try:
+            server_process.wait(timeout=2)
+        except subprocess.TimeoutExpired:
+            server_process.kill()
+            server_process.wait()
+    server_process = None
+
+
+def file_stat(path: str) -> Optional[os.stat_result]:
+    """
+    Gets the status of a regular file with a single stat call.
+    :param path: Path to the file.
+    :return: The status of the file, or None if it does not exist or is not a regular file.
+    """
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st if stat.S_ISREG(st.st_mode) else None
+
+
+def can_execute(st: os.stat_result) -> bool:
+    """
+    Checks whether the effective user may execute a file, using the permission bits that apply to it
+    (like os.access(path, os.X_OK), but from an existing stat result).
+    :param st: The status of the file.
+    :return: True if the file is executable by the effective user, False otherwise.
+    """
+    euid = os.geteuid()
+    if euid == 0:
+        return bool(st.st_mode & 0o111)
+    if st.st_uid == euid:
+        return bool(st.st_mode & stat.S_IXUSR)
+    if st.st_gid == os.getegid() or st.st_gid in os.getgroups():
+        return bool(st.st_mode & stat.S_IXGRP)
+    return bool(st.st_mode & stat.S_IXOTH)
+
+
+def is_executable_file(path: str) -> bool:
+    """
+    Checks whether a path is a regular file that the effective user may execute.
+    :param path: Path to the file.
+    :return: True if the file is executable, False otherwise.
+    """
+    st = file_stat(path)
+    return st is not None and can_execute(st)
 
 
+@lru_cache(maxsize=None)
+def path_dirs() -> Tuple[str, ...]:
+    """
+    Gets the directories in PATH, without empty and duplicate entries.
+    :return: Tuple of the directories, in order.
+    """
+    paths = dict.fromkeys(path.strip('"') for path in os.environ.get('PATH', os.defpath).split(os.pathsep))
+    paths.pop('', None)
+    return tuple(paths)
+
+
+@lru_cache(maxsize=None)
+def current_dir() -> str:
+    """
+    Gets the current working directory.
+    :return: Absolute path to the current working directory.
+    """
+    return os.getcwd()
+
+
+@lru_cache(maxsize=None)
 def find_executable(executable_name: str, executable_path: str = None) -> str:
     """
     Finds an executable by name or path.
+
+    Without a path, the executable is searched for in the current working directory, then in PATH.
+    Successful lookups are cached.
     :param executable_name: Name of the executable.
     :param executable_path: Optional path to the executable.
     :return: Absolute path to the executable.
     """
     # Check if the provided path, if any, is valid
     if executable_path is not None:
-        if os.path.isfile(executable_path):
-            if os.access(executable_path, os.X_OK):
-                return os.path.abspath(executable_path)
-            else:
-                raise PermissionError(f'Provided {executable_name} path {executable_path} is not executable.')
-        else:
+        st = file_stat(executable_path)
+        if st is None:
             raise FileNotFoundError(f'Provided {executable_name} path {executable_path} is not a valid executable.')
+        if not can_execute(st):
+            raise PermissionError(f'Provided {executable_name} path {executable_path} is not executable.')
+        return os.path.abspath(executable_path)
 
     # Check the current working directory
-    candidate = os.path.join(os.getcwd(), executable_name)
-    if os.path.isfile(candidate):
-        if os.access(candidate, os.X_OK):
+    candidate = os.path.join(current_dir(), executable_name)
+    st = file_stat(candidate)
+    if st is not None:
+        if can_execute(st):
             return os.path.abspath(candidate)
-        else:
-            raise PermissionError(f'{executable_name} found in the current working directory is not executable.')
+        raise PermissionError(f'{executable_name} found in the current working directory is not executable.')
 
     # If not found, check the PATH
-    for path in os.environ['PATH'].split(os.pathsep):
-        path = path.strip('"')
+    for path in path_dirs():
         candidate = os.path.join(path, executable_name)
-        if os.path.isfile(candidate) and os.access(candidate, os.X_OK):
-            raise FileNotFoundError(f'{executable_name} not found in the current working directory.'
-                                    f'\nDid you mean {os.path.abspath(candidate)}?')
+        if is_executable_file(candidate):
+            return os.path.abspath(candidate)
 
     raise FileNotFoundError(f'{executable_name} executable not found.')
 
@@ -186,66 +333,358 @@ def find_client(client_path: str = None) -> str:
     return find_executable('client', client_path)
 
 
-def parse_cases(cases: str) -> Tuple[List[str], List[str]]:
+# Serialization tags used by the server (see common.h)
+SER_NIL, SER_ERR, SER_STR, SER_INT, SER_DBL, SER_ARR = range(6)
+
+# Maximum message size accepted by the server and the client
+K_MAX_MSG = 4096
+
+
+class ClientProto:
+    """
+    A persistent connection to the server that speaks the wire protocol directly.
+
+    Requests and responses are framed the same way as in the C client,
+    and responses are formatted exactly as the client prints them.
+    """
+
+    def __init__(self, port: int = 1234, timeout: float = 5) -> None:
+        """
+        Connects to the server.
+        :param port: Port number to connect to.
+        :param timeout: Timeout in seconds for each socket operation.
+        """
+        self.sock = socket.create_connection((SERVER_HOST, port), timeout=timeout)
+
+    def __enter__(self) -> 'ClientProto':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """
+        Closes the connection.
+        :return: None
+        """
+        self.sock.close()
+
+    def send(self, argv: Sequence[str]) -> None:
+        """
+        Sends a request to the server.
+        :param argv: The command and its arguments.
+        :return: None
+        """
+        args = [arg.encode('utf-8') for arg in argv]
+        body = struct.pack('<I', len(args)) + b''.join(struct.pack('<I', len(arg)) + arg for arg in args)
+        if len(body) > K_MAX_MSG:
+            raise ValueError('Request is too long.')
+        self.sock.sendall(struct.pack('<I', len(body)) + body)
+
+    def recv(self) -> bytes:
+        """
+        Reads a response from the server.
+        :return: The response, formatted the same way as the client prints it.
+        """
+        (length,) = struct.unpack('<I', self._recv_exact(4))
+        if length > K_MAX_MSG:
+            raise ConnectionError('Response is too long.')
+        data = self._recv_exact(length)
+
+        lines = []
+        if self._format(data, 0, lines) != length:
+            raise ConnectionError('Bad response from the server.')
+        return b''.join(lines)
+
+    def _recv_exact(self, n: int) -> bytes:
+        """
+        Reads exactly n bytes from the connection.
+        :param n: Number of bytes to read.
+        :return: The bytes read.
+        """
+        buf = bytearray()
+        while len(buf) < n:
+            chunk = self.sock.recv(n - len(buf))
+            if not chunk:
+                raise ConnectionResetError('Connection reset by peer.')
+            buf += chunk
+        return bytes(buf)
+
+    def _format(self, data: bytes, pos: int, lines: List[bytes]) -> int:
+        """
+        Formats one serialized value.
+        :param data: The response payload.
+        :param pos: Offset of the value in the payload.
+        :param lines: List to append the formatted lines to.
+        :return: Offset just past the value.
+        """
+        try:
+            tag = data[pos]
+            pos += 1
+            if tag == SER_NIL:
+                lines.append(b'(nil)\n')
+            elif tag == SER_ERR:
+                code, length = struct.unpack_from('<iI', data, pos)
+                pos += 8
+                lines.append(b'(err) %d %s\n' % (code, data[pos:pos + length]))
+                pos += length
+            elif tag == SER_STR:
+                (length,) = struct.unpack_from('<I', data, pos)
+                pos += 4
+                lines.append(b'(str) %s\n' % data[pos:pos + length])
+                pos += length
+            elif tag == SER_INT:
+                lines.append(b'(int) %d\n' % struct.unpack_from('<q', data, pos))
+                pos += 8
+            elif tag == SER_DBL:
+                lines.append(b'(dbl) %g\n' % struct.unpack_from('<d', data, pos))
+                pos += 8
+            elif tag == SER_ARR:
+                (length,) = struct.unpack_from('<I', data, pos)
+                pos += 4
+                lines.append(b'(arr) len=%d\n' % length)
+                for _ in range(length):
+                    pos = self._format(data, pos, lines)
+                lines.append(b'(arr) end\n')
+            else:
+                raise ConnectionError('Bad response from the server.')
+        except (IndexError, struct.error):
+            raise ConnectionError('Bad response from the server.') from None
+
+        if pos > len(data):
+            raise ConnectionError('Bad response from the server.')
+        return pos
+
+
+class ClientRepl:
+    """
+    A single client process in REPL mode, with the same interface as ClientProto.
+
+    Commands are written to the client's stdin, one per line,
+    and the client prints an '(end)' line after each response.
+    """
+
+    def __init__(self, client: str, port: int = 1234, timeout: float = 5) -> None:
+        """
+        Starts the client.
+        :param client: Path to the client executable.
+        :param port: Port number to connect to.
+        :param timeout: Timeout in seconds for each response.
+        """
+        self.proc = subprocess.Popen([client, '--port', str(port), '--repl'], stdin=subprocess.PIPE,
+                                     stdout=subprocess.PIPE, stderr=subprocess.PIPE, close_fds=False)
+        self.timeout = timeout
+        self.buf = bytearray()
+
+    def __enter__(self) -> 'ClientRepl':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """
+        Closes the client's stdin and waits for it to exit.
+        :return: None
+        """
+        try:
+            self.proc.stdin.close()
+        except BrokenPipeError:
+            pass
+        try:
+            self.proc.wait(timeout=self.timeout)
+        except subprocess.TimeoutExpired:
+            self.proc.kill()
+            self.proc.wait()
+        self.proc.stdout.close()
+        self.proc.stderr.close()
+
+    def send(self, argv: Sequence[str]) -> None:
+        """
+        Sends a command to the client.
+        :param argv: The command and its arguments.
+        :return: None
+        """
+        self.proc.stdin.write(f'{shlex.join(argv)}\n'.encode('utf-8'))
+        self.proc.stdin.flush()
+
+    def recv(self) -> bytes:
+        """
+        Reads the next response printed by the client.
+        :return: The response, without the end marker.
+        """
+        lines = []
+        while (line := self._readline()) != b'(end)\n':
+            lines.append(line)
+        return b''.join(lines)
+
+    def _readline(self) -> bytes:
+        """
+        Reads one line of the client's output.
+        :return: The line, including the newline.
+        """
+        fd = self.proc.stdout.fileno()
+        while (i := self.buf.find(b'\n')) < 0:
+            if not select.select([fd], [], [], self.timeout)[0]:
+                raise TimeoutError('The client did not respond in time.')
+            chunk = os.read(fd, 65536)
+            if not chunk:
+                # The client exited: report why, like a failed client process
+                self.proc.wait()
+                raise subprocess.CalledProcessError(self.proc.returncode, self.proc.args, self.proc.stderr.read())
+            self.buf += chunk
+
+        line = bytes(self.buf[:i + 1])
+        del self.buf[:i + 1]
+        return line
+
+
+# Commands that do not modify the data set, so consecutive runs of them can be executed concurrently
+READ_ONLY_CMDS = frozenset({'get', 'keys', 'exists', 'pttl', 'zscore', 'zquery', 'command'})
+
+# Maximum number of client processes to run at the same time
+MAX_WORKERS = 8
+
+
+def command_name(case: Case) -> str:
     """
-    Parses the test cases into commands and expected outputs.
-    :param cases: String containing the test cases.
-    :return: Tuple of lists of str commands and expected outputs.
+    Gets the name of a test case's command, in lower case.
+    :param case: The test case.
+    :return: The command name, or an empty string if the case has no command.
     """
-    cmds_, outputs_ = [], []
-    for line in cases.splitlines():
-        line = line.strip()
-        if line.startswith('$ '):  # Command
-            cmds_.append(line[2:])
-            outputs_.append('')
-        elif line:  # Output
-            outputs_[-1] += line + '\n'
-    return cmds_, outputs_
+    return case.argv[0].lower() if case.argv else ''
 
 
-def run_commands(cmds_: List[str], outputs_: List[str], port: int = 1234) -> bool:
+def group_commands(cases_: Sequence[Case]) -> List[Tuple[int, int]]:
+    """
+    Splits the test cases into groups whose commands can run concurrently.
+
+    Consecutive read-only commands share a group.
+    Any other command may modify the data set, so it acts as a barrier and runs alone.
+    :param cases_: List of test cases.
+    :return: List of (start, stop) index ranges of the groups, in order.
+    """
+    groups = []
+    start = 0
+    for i, case in enumerate(cases_):
+        if command_name(case) not in READ_ONLY_CMDS:
+            if start < i:
+                groups.append((start, i))
+            groups.append((i, i + 1))
+            start = i + 1
+    if start < len(cases_):
+        groups.append((start, len(cases_)))
+    return groups
+
+
+# Runs a command (the client path, the command and its arguments) with the client executable,
+# and returns the raw output of the client.
+# The script creates all its file descriptors non-inheritable (PEP 446), so there is nothing
+# for the child to close, and skipping close_fds saves a pass over the descriptor table per spawn.
+run_client = partial(subprocess.check_output, timeout=5, stderr=subprocess.STDOUT, close_fds=False)
+
+
+def run_clients(executor: 'ThreadPoolExecutor', argvs: List[List[str]]) -> List[Callable[[], bytes]]:
+    """
+    Runs commands with the client executable concurrently.
+    :param executor: The thread pool to run the client processes on.
+    :param argvs: List of command argument vectors.
+    :return: Callables that wait for the output of each command (or raise its error), in order.
+    """
+    return [executor.submit(run_client, argv).result for argv in argvs]
+
+
+def run_commands(cases_: Sequence[Case], port: int = 1234, client: Optional[str] = None,
+                 legacy_spawn: bool = False) -> bool:
     """
     Run the commands and compare the output with the expected output.
-    :param cmds_: List of str commands to run.
-    :param outputs_: List of str expected outputs.
+
+    The commands are sent over a direct connection to the server, or through one client process in REPL mode.
+    Independent read-only commands are pipelined, but the outputs are still checked in order.
+    :param cases_: List of test cases to run.
     :param port: Port number to connect to.
+    :param client: Path to the client executable to run the commands with, or None for a direct connection.
+    :param legacy_spawn: Run each command in a separate client process (requires client).
+                         Independent read-only commands are then run concurrently.
     :return: True if all tests pass, False otherwise.
     """
-    success = True
-    for cmd, expected in zip(cmds_, outputs_):
-        cmd = f"{cmd} --port {port}"
+    global shutdown_sent
+    session = None
+    executor = None
+    if legacy_spawn:
+        # Imported here, as only this mode needs it (it pulls in logging, among others)
+        from concurrent.futures import ThreadPoolExecutor
+
+        # One pool for the whole run; each group is drained before the next one is submitted
+        executor = ThreadPoolExecutor(max_workers=MAX_WORKERS)
+        # Add the port to every command up front, rather than per group
+        port_args = ['--port', str(port)]
+        client_argvs = [[client, *case.argv, *port_args] for case in cases_]
+    elif client is not None:
+        session = ClientRepl(client, port)
+    else:
         try:
-            out = subprocess.check_output(shlex.split(cmd), timeout=5, stderr=subprocess.STDOUT).decode('utf-8')
+            session = ClientProto(port)
+        except ConnectionRefusedError:
+            raise ConnectionError('Connection refused. Is the server running?') from None
 
-        except subprocess.TimeoutExpired:
-            cmd_no_name = ' '.join(cmd.split()[1:])
-
-            print(colored(f"Command '", 'red'), end='')
-            print(colored(cmd_no_name, 'blue', attrs=['bold', 'underline']), end='')
-            print(colored("' did not complete within the specified timeout.", 'red'))
-            success = False
-            continue
-
-        # Handle non-zero exit status
-        except subprocess.CalledProcessError as e:
-            out = e.output.decode('utf-8').strip()
-            if "Connection refused" in out:
-                raise ConnectionError('Connection refused. Is the server running?')
-            if "Connection reset by peer" in out:
-                raise ConnectionError('Connection reset by peer. The server may have exited unexpectedly.')
-            raise e
-
-        if out != expected:
-            cmd_no_name = ' '.join(cmd.split()[1:])
-
-            print(colored(f"command '", 'cyan'), colored(cmd_no_name, 'yellow', attrs=['bold']), sep='', end='')
-            print(colored("' failed.", 'cyan'), '\n')
-            print(colored("Output:", 'blue', attrs=['bold']))
-            print(colored(out, 'red'))
-
-            print(colored("Expected:", 'blue', attrs=['bold']))
-            print(colored(expected, 'green'), '\n', colored("-" * 60, 'magenta'), sep='')
-            success = False
+    success = True
+    try:
+        for start, stop in group_commands(cases_):
+            batch = cases_[start:stop]
+            try:
+                if session is None:
+                    replies = run_clients(executor, client_argvs[start:stop])
+                else:
+                    for case in batch:
+                        session.send(case.argv)
+                    replies = [session.recv] * len(batch)
+            except (ConnectionResetError, BrokenPipeError):
+                raise ConnectionError('Connection reset by peer. The server may have exited unexpectedly.') from None
+
+            for case, reply in zip(batch, replies):
+                try:
+                    out = reply()
+
+                except (subprocess.TimeoutExpired, TimeoutError):
+                    sys.stdout.write(f"{RED}Command '{RESET}{BLUE_BOLD_UNDERLINE}{case.display}{RESET}"
+                                     f"{RED}' did not complete within the specified timeout.{RESET}\n")
+                    if session is not None:
+                        # A late reply would be mistaken for the next one
+                        return False
+                    success = False
+                    continue
+
+                # Handle non-zero exit status
+                except subprocess.CalledProcessError as e:
+                    out = e.output.decode('utf-8').strip()
+                    if "Connection refused" in out:
+                        raise ConnectionError('Connection refused. Is the server running?')
+                    if "Connection reset by peer" in out:
+                        raise ConnectionError('Connection reset by peer. The server may have exited unexpectedly.')
+                    if isinstance(session, ClientRepl) and not out:
+                        raise ConnectionError('The client exited unexpectedly. '
+                                              'If it does not support --repl, run the tests with --legacy-spawn.')
+                    raise e
+
+                except (ConnectionResetError, BrokenPipeError):
+                    raise ConnectionError(
+                        'Connection reset by peer. The server may have exited unexpectedly.') from None
+
+                if out != case.expected:
+                    sys.stdout.write(f"{CYAN}command '{RESET}{YELLOW_BOLD}{case.display}{RESET}"
+                                     f"{CYAN}' failed.{RESET} \n\n"
+                                     f"{BLUE_BOLD}Output:{RESET}\n{RED}{out.decode('utf-8', 'replace')}{RESET}\n"
+                                     f"{BLUE_BOLD}Expected:{RESET}\n{GREEN}{case.expected.decode('utf-8')}{RESET}\n"
+                                     f"{MAGENTA}{'-' * 60}{RESET}\n")
+                    success = False
+                elif command_name(case) == 'shutdown':
+                    shutdown_sent = True
+    finally:
+        if session is not None:
+            session.close()
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
 
     return success
 
@@ -256,13 +695,11 @@ def print_help(executable: str) -> None:
     :param executable: Name of the executable.
     :return: None
     """
-    print(colored('Example:', 'cyan'), colored(f'{sys.argv[0]} --{executable} /path/to/{executable}',
-                                               'yellow', attrs=['bold']), '\n')
-    print(colored(f'Alternatively, place the {executable} executable in the current working directory.', 'cyan'))
-    print(colored(f'Ensure the {executable} executable is named', 'cyan'),
-          colored(f'{executable}', 'yellow', attrs=['bold', 'reverse']),
-          colored(f'and has execute permissions.', 'cyan'), '\n')
-    print(colored('For more options, run', 'cyan'), colored(f'{sys.argv[0]} --help', 'yellow', attrs=['bold']))
+    print(f'{CYAN}Example:{RESET} {YELLOW_BOLD}{sys.argv[0]} --{executable} /path/to/{executable}{RESET}', '\n')
+    print(f'{CYAN}Alternatively, place the {executable} executable in the current working directory.{RESET}')
+    print(f'{CYAN}Ensure the {executable} executable is named{RESET} {YELLOW_BOLD_REVERSE}{executable}{RESET}',
+          f'{CYAN}and has execute permissions.{RESET}', '\n')
+    print(f'{CYAN}For more options, run{RESET} {YELLOW_BOLD}{sys.argv[0]} --help{RESET}')
 
 
 if __name__ == '__main__':
@@ -274,95 +711,99 @@ if __name__ == '__main__':
     parser.add_argument('--client', type=str, help='path to the client executable')
     parser.add_argument('--server', type=str, help='path to the server executable')
     parser.add_argument('--port', type=int, default=1234, help='port number to use for communication')
+    parser.add_argument('--use-binary-client', action='store_true',
+                        help='run each command with the client executable instead of a direct connection')
+    parser.add_argument('--legacy-spawn', action='store_true',
+                        help='run each command in a separate client process (implies --use-binary-client)')
     parser.add_argument('--no-color', action='store_true', help='disable colored output')
     args = parser.parse_args()
 
     # Port number must be valid
     if not 0 < args.port <= 65535:
-        print(colored('Port number must be between 0 and 65535.', 'red'), file=sys.stderr)
+        print(f'{RED}Port number must be between 0 and 65535.{RESET}', file=sys.stderr)
         exit(1)
 
-    print(colored('Using port:', 'green'), colored(args.port, 'yellow', attrs=['bold']), '\n')
+    print(f'{GREEN}Using port:{RESET}', f'{YELLOW_BOLD}{args.port}{RESET}', '\n')
 
     # Disable colored output if requested
     if args.no_color:
         os.environ['NO_COLOR'] = '1'
+        init_colors()
 
     # The server must be running
     if not is_server_running(args.port):
         try:
             server = find_server(args.server)
-            print(colored('Using server:', 'green'), colored(server, 'yellow', attrs=['bold']))
+            print(f'{GREEN}Using server:{RESET}', f'{YELLOW_BOLD}{server}{RESET}')
             start_server(server, args.port)
 
         except TimeoutError as err:
-            print(colored(err, 'red'), '\n', file=sys.stderr)
+            print(f'{RED}{err}{RESET}', '\n', file=sys.stderr)
             exit(1)
 
         except FileNotFoundError as err:
-            print(colored('Server is not running.', 'red', attrs=['bold']), file=sys.stderr)
-            print(colored(err, 'red'), '\n', file=sys.stderr)
-            print(colored('Please start the server before running the tests.', 'cyan'))
-            print(colored('You can also provide the path to the server executable using the --server flag.', 'cyan'))
+            print(f'{RED_BOLD}Server is not running.{RESET}', file=sys.stderr)
+            print(f'{RED}{err}{RESET}', '\n', file=sys.stderr)
+            print(f'{CYAN}Please start the server before running the tests.{RESET}')
+            print(f'{CYAN}You can also provide the path to the server executable using the --server flag.{RESET}')
             print_help('server')
             exit(1)
 
         except PermissionError as err:
-            print(colored(err, 'red'), file=sys.stderr)
-            print(colored('Ensure the server executable has execute permissions.', 'cyan'))
+            print(f'{RED}{err}{RESET}', file=sys.stderr)
+            print(f'{CYAN}Ensure the server executable has execute permissions.{RESET}')
             exit(1)
 
         except BaseException as err:
-            print(colored(err, 'red'), file=sys.stderr)
+            print(f'{RED}{err}{RESET}', file=sys.stderr)
             exit(1)
 
-    try:
-        client = find_client(args.client)
-        print(colored('Using client:', 'green'), colored(client, 'yellow', attrs=['bold']), '\n')
-    except FileNotFoundError as err:
-        print(colored(err, 'red', attrs=['bold']), '\n', file=sys.stderr)
-        print(colored('Please provide the path to the client executable using the --client flag.', 'cyan'))
-        print_help('client')
-        exit(1)
+    # Passing a client path implies testing through the client executable
+    use_binary_client = args.use_binary_client or args.legacy_spawn or args.client is not None
 
-    except PermissionError as err:
-        print(colored(err, 'red'), file=sys.stderr)
-        print(colored('Ensure the client executable has execute permissions.', 'cyan'))
-        exit(1)
-
-    except BaseException as err:
-        print(colored(err, 'red'), file=sys.stderr)
-        exit(1)
+    client = None
+    if use_binary_client:
+        try:
+            client = find_client(args.client)
+            print(f'{GREEN}Using client:{RESET}', f'{YELLOW_BOLD}{client}{RESET}', '\n')
+        except FileNotFoundError as err:
+            print(f'{RED_BOLD}{err}{RESET}', '\n', file=sys.stderr)
+            print(f'{CYAN}Please provide the path to the client executable using the --client flag.{RESET}')
+            print_help('client')
+            exit(1)
 
-    # Replace './client' with the actual client path in the CASES string
-    formatted_cases = CASES.replace('./client', client)
+        except PermissionError as err:
+            print(f'{RED}{err}{RESET}', file=sys.stderr)
+            print(f'{CYAN}Ensure the client executable has execute permissions.{RESET}')
+            exit(1)
 
-    cmds, outputs = parse_cases(formatted_cases)
-    if len(cmds) != len(outputs):
-        print(colored('Number of commands and outputs do not match.', 'red'), file=sys.stderr)
-        exit(1)
+        except BaseException as err:
+            print(f'{RED}{err}{RESET}', file=sys.stderr)
+            exit(1)
+    else:
+        print(f'{GREEN}Using client:{RESET}', f'{YELLOW_BOLD}direct connection{RESET}', '\n')
 
     try:
-        all_tests_passed = run_commands(cmds, outputs, args.port)
+        all_tests_passed = run_commands(CASES, args.port, client, args.legacy_spawn)
     except ConnectionError as err:
-        print(colored(err, 'red'), file=sys.stderr)
+        print(f'{RED}{err}{RESET}', file=sys.stderr)
         exit(1)
 
     except subprocess.CalledProcessError as err:
         error = err.output.decode('utf-8').strip()
         if error:
-            print(colored(error, 'red'), file=sys.stderr)
+            print(f'{RED}{error}{RESET}', file=sys.stderr)
         else:
-            print(colored('Command failed with exit status', 'red'),
-                  colored(err.returncode, 'blue', attrs=['bold']), file=sys.stderr)
+            print(f'{RED}Command failed with exit status{RESET}',
+                  f'{BLUE_BOLD}{err.returncode}{RESET}', file=sys.stderr)
         exit(1)
 
     except BaseException as err:
-        print(colored(err, 'red'), file=sys.stderr)
+        print(f'{RED}{err}{RESET}', file=sys.stderr)
         exit(1)
 
     if all_tests_passed:
-        print(colored('All tests passed.', 'green'))
+        print(f'{GREEN}All tests passed.{RESET}')
     else:
-        print(colored('Some tests failed.', 'red'), file=sys.stderr)
+        print(f'{RED}Some tests failed.{RESET}', file=sys.stderr)
         exit(1)